@@ -12,158 +12,189 @@ Example: python def_eco_analyzer.py aes_cipher_top_orig.def aes_cipher_top_repai
 """
 
 
+import functools
+import heapq
+import mmap
+import os
 import re
 import sys
-from typing import Dict, Set, List, Tuple
+from typing import Dict, FrozenSet, Set, List, NamedTuple, Tuple
 from collections import defaultdict
+from dataclasses import dataclass
+
+# Size/strength suffixes like x1, x2, x3, x4, x6, x8, xp5, etc.
+# Handles both integer (x1, x2) and fractional (xp5 = x0.5) drive strengths
+_SIZE_RE = re.compile(r'x(?:\d+|p\d+)[a-zA-Z]*')
+
+# DEF section headers "<NAME> <count> ;" and terminators "END <NAME>"; anchoring
+# at line start (after optional indentation) keeps NETS from matching SPECIALNETS
+_RE_COMPONENTS_START = re.compile(rb'^[ \t]*COMPONENTS\s+\d+\s*;', re.M)
+_RE_COMPONENTS_END = re.compile(rb'^[ \t]*END\s+COMPONENTS\b', re.M)
+_RE_NETS_START = re.compile(rb'^[ \t]*NETS\s+\d+\s*;', re.M)
+_RE_NETS_END = re.compile(rb'^[ \t]*END\s+NETS\b', re.M)
+
+# DEF COMPONENTS section records: "- <instance_name> <cell_type> + ... ;"
+_RE_COMPONENT = re.compile(rb'-\s+(\S+)\s+(\S+)\s+[^;]*;')
+
+# DEF NETS section records: a whole "- <net_name> ... ;" entry and its
+# "( instance pin )" connections
+_RE_NET_ENTRY = re.compile(rb'-\s+(\S+)([^;]*);')
+_RE_CONN = re.compile(rb'\(\s*(\S+)\s+(\S+)\s*\)')
+
+# Common buffer output pin names
+_OUTPUT_PINS = frozenset(('Y', 'Z', 'Q'))
+
+@functools.lru_cache(maxsize=None)
+def _base_func(cell_type: str) -> str:
+    """Return the cell type with its size indicators removed (e.g. INVx3 -> INVx)"""
+    # Every size suffix starts with 'x'; names without one (e.g. sky130 cells)
+    # skip the substitution, which costs several times this substring scan
+    if 'x' not in cell_type:
+        return cell_type
+    return _SIZE_RE.sub('x', cell_type)
+
+class Net(NamedTuple):
+    """Connections of one net, stored as parallel instance/pin lists"""
+    instances: List[str]
+    pins: List[str]
+
+@dataclass
+class BufEntry:
+    """One insert_buffer command, parsed once for dependency sorting"""
+    cmd: str
+    name: str  # new buffer instance
+    load_insts: FrozenSet[str]  # instances of the pins the buffer drives
 
 class DEFParser:
-    def __init__(self, def_file_path: str):
+    def __init__(self, def_file_path: str, parse_nets: bool = True):
         self.def_file_path = def_file_path
+        self.parse_nets = parse_nets  # False skips the NETS section, leaving nets empty
         self.components = {}  # {cell_name: cell_type}
-        self.nets = {}  # {net_name: [(instance, pin), ...]}
+        self.nets = {}  # {net_name: Net([instance, ...], [pin, ...])}
         self.parse_def()
     
     def parse_def(self):
         """Parse DEF file to extract components and nets"""
-        with open(self.def_file_path, 'r') as f:
-            content = f.read()
-        
-        # Parse components section
-        self._parse_components(content)
+        with open(self.def_file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                print("Warning: No COMPONENTS section found")
+                if self.parse_nets:
+                    print("Warning: No NETS section found")
+                return
+            
+            # Map the file instead of reading it so only the sections we
+            # touch are paged in and no second copy of the file is made
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Parse components section
+                self._parse_components(mm)
+                
+                # Parse nets section
+                if self.parse_nets:
+                    self._parse_nets(mm)
+    
+    @staticmethod
+    def _find_section(mm: mmap.mmap, start_re, end_re):
+        """Return (start, end) byte offsets of a section body, or None if absent"""
+        header = start_re.search(mm)
+        if not header:
+            return None
         
-        # Parse nets section
-        self._parse_nets(content)
+        # Body starts right after "<NAME> <count> ;"
+        start = header.end()
+        footer = end_re.search(mm, start)
+        end = footer.start() if footer else len(mm)
+        return start, end
     
-    def _parse_components(self, content: str):
+    def _parse_components(self, mm: mmap.mmap):
         """Parse COMPONENTS section"""
-        # Find COMPONENTS section
-        components_match = re.search(r'COMPONENTS\s+(\d+)\s*;(.*?)END\s+COMPONENTS', content, re.DOTALL)
-        if not components_match:
+        section = self._find_section(mm, _RE_COMPONENTS_START, _RE_COMPONENTS_END)
+        if not section:
             print("Warning: No COMPONENTS section found")
             return
         
-        components_content = components_match.group(2)
-        
-        # Parse individual components
-        # Pattern: - <instance_name> <cell_type> + ... ;
-        component_pattern = r'-\s+(\S+)\s+(\S+)\s+[^;]*;'
-        matches = re.findall(component_pattern, components_content)
-        
-        for instance_name, cell_type in matches:
-            self.components[instance_name] = cell_type
+        # Records may wrap across lines, so match whole records over the mapped section
+        for match in _RE_COMPONENT.finditer(mm, *section):
+            # Cell types repeat across many instances, so share one str each;
+            # instance names are mostly unique and are left as-is
+            self.components[match.group(1).decode()] = sys.intern(match.group(2).decode())
     
-    def _parse_nets(self, content: str):
+    def _parse_nets(self, mm: mmap.mmap):
         """Parse NETS section"""
-        # Find NETS section
-        nets_match = re.search(r'NETS\s+(\d+)\s*;(.*?)END\s+NETS', content, re.DOTALL)
-        if not nets_match:
+        section = self._find_section(mm, _RE_NETS_START, _RE_NETS_END)
+        if not section:
             print("Warning: No NETS section found")
             return
         
-        nets_content = nets_match.group(2)
-        
-        # Parse individual nets - handle multi-line definitions
-        # Split by lines starting with "- " but preserve multi-line entries until ";"
-        net_entries = []
-        current_entry = ""
-        
-        for line in nets_content.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            
-            if line.startswith('- '):
-                # Start of new net entry
-                if current_entry:
-                    net_entries.append(current_entry)
-                current_entry = line[2:]  # Remove "- " prefix
-            elif current_entry:
-                # Continuation of current net entry
-                current_entry += " " + line
-            
-            # Check if entry is complete (ends with semicolon)
-            if current_entry and current_entry.rstrip().endswith(';'):
-                net_entries.append(current_entry)
-                current_entry = ""
-        
-        # Add any remaining entry
-        if current_entry:
-            net_entries.append(current_entry)
-        
-        # Parse each complete net entry
-        for net_entry in net_entries:
-            if not net_entry.strip():
-                continue
-            
-            # Remove trailing semicolon and any extra whitespace
-            net_entry = net_entry.rstrip(';').strip()
-            
-            # Extract net name and connections
-            # Format: netname ( instance pin ) ( instance pin ) ... + USE SIGNAL
-            parts = net_entry.split('(', 1)
-            if len(parts) < 2:
-                continue
-            
-            net_name = parts[0].strip()
-            connections_str = '(' + parts[1]
-            
+        # Each entry "- <net_name> ( instance pin ) ... + USE SIGNAL ;" may span
+        # several lines; scan the mapped section directly, one match per entry
+        for match in _RE_NET_ENTRY.finditer(mm, *section):
             # Parse connections: ( instance pin )
-            connections = []
-            conn_pattern = r'\(\s*(\S+)\s+(\S+)\s*\)'
-            conn_matches = re.findall(conn_pattern, connections_str)
+            instances = []
+            pins = []
+            for instance, pin in _RE_CONN.findall(match.group(2)):
+                instances.append(instance.decode())
+                # Only a handful of distinct pin names exist, so share one str each
+                pins.append(sys.intern(pin.decode()))
             
-            for instance, pin in conn_matches:
-                connections.append((instance, pin))
-            
-            if connections:  # Only store nets with connections
-                self.nets[net_name] = connections
+            if instances:  # Only store nets with connections
+                self.nets[match.group(1).decode()] = Net(instances, pins)
 
 class ECOAnalyzer:
     def __init__(self, original_def: str, modified_def: str):
-        self.original = DEFParser(original_def)
+        # Only the modified design's connectivity is used, so skip the original's nets
+        self.original = DEFParser(original_def, parse_nets=False)
         self.modified = DEFParser(modified_def)
         self.sizing_commands = []
         self.buffering_commands = []
+        self._mod_inst_pins = defaultdict(list)  # {instance: [(net, pin), ...]} in modified design
     
     def analyze(self):
         """Analyze differences and generate ECO commands"""
         self._find_sizing_changes()
         self._find_buffering_changes()
     
+    def _build_instance_index(self):
+        """Index the modified design's net connections by instance"""
+        self._mod_inst_pins = defaultdict(list)
+        for net_name, net in self.modified.nets.items():
+            for instance, pin in zip(net.instances, net.pins):
+                self._mod_inst_pins[instance].append((net_name, pin))
+    
     def _find_sizing_changes(self):
         """Find cells that have been resized"""
         print("Analyzing sizing changes...")
         
-        # Find common cells that changed type
-        common_cells = set(self.original.components.keys()) & set(self.modified.components.keys())
-        
-        for cell_name in common_cells:
-            orig_type = self.original.components[cell_name]
-            mod_type = self.modified.components[cell_name]
+        # Find common cells that changed type, probing the original design per
+        # cell instead of materializing key sets of both designs
+        orig_components = self.original.components
+        for cell_name, mod_type in self.modified.components.items():
+            orig_type = orig_components.get(cell_name)
+            
+            # Cell types are interned by DEFParser, so unchanged cells share the same
+            # object and this comparison returns on the identity check
+            if orig_type is None or orig_type == mod_type:
+                continue
             
-            if orig_type != mod_type:
-                # Check if it's the same function (e.g., INVx3 -> INVx8)
-                if self._is_same_function(orig_type, mod_type):
-                    self.sizing_commands.append(f"size_cell {cell_name} {mod_type}")
+            # Check if it's the same function (e.g., INVx3 -> INVx8)
+            if self._is_same_function(orig_type, mod_type):
+                self.sizing_commands.append(f"size_cell {cell_name} {mod_type}")
     
     def _is_same_function(self, orig_type: str, mod_type: str) -> bool:
         """Check if two cell types have the same function but different sizes"""
-        # Extract base function (remove size/strength indicators)
-        def get_base_function(cell_type):
-            # Remove common size indicators like x1, x2, x3, x4, x6, x8, xp5, etc.
-            # Handle both integer (x1, x2) and fractional (xp5 = x0.5) drive strengths
-            base = re.sub(r'x(?:\d+|p\d+)[a-zA-Z]*', 'x', cell_type)
-            return base
-        
-        return get_base_function(orig_type) == get_base_function(mod_type)
+        return _base_func(orig_type) == _base_func(mod_type)
     
     def _find_buffering_changes(self):
         """Find buffer insertions"""
         print("Analyzing buffering changes...")
         
         # Find new components in modified design
-        new_components = set(self.modified.components.keys()) - set(self.original.components.keys())
+        orig_components = self.original.components
+        new_components = [name for name in self.modified.components if name not in orig_components]
+        if not new_components:
+            self.buffering_commands = []
+            return
+        
+        self._build_instance_index()
         
         # Store all buffer commands before sorting
         buffer_commands = []
@@ -182,35 +213,24 @@ class ECOAnalyzer:
     
     def _analyze_buffer_insertion(self, buffer_name: str, buffer_type: str):
         """Analyze a specific buffer insertion and return command string"""
-        # Find the net driven by this buffer (buffer output)
+        # Find the net driven by this buffer (buffer output) from its own pins
         buffer_output_net = None
-        buffer_input_net = None
-        
-        for net_name, connections in self.modified.nets.items():
-            for instance, pin in connections:
-                if instance == buffer_name:
-                    if pin in ['Y', 'Z', 'Q']:  # Common output pin names
-                        buffer_output_net = net_name
-                    elif pin in ['A', 'D', 'IN']:  # Common input pin names
-                        buffer_input_net = net_name
+        for net_name, pin in self._mod_inst_pins.get(buffer_name, ()):
+            if pin in _OUTPUT_PINS:
+                buffer_output_net = net_name
         
         if not buffer_output_net:
             print(f"Warning: Could not find output net for buffer {buffer_name}")
             return None
         
-        # Find load pins driven by this buffer
-        load_pins = []
-        if buffer_output_net in self.modified.nets:
-            for instance, pin in self.modified.nets[buffer_output_net]:
-                if instance != buffer_name:  # Exclude the buffer itself
-                    load_pins.append(f"{instance}/{pin}")
+        # Load pins driven by this buffer, excluding the buffer itself
+        net = self.modified.nets[buffer_output_net]
+        load_pins_str = " ".join(f"{instance}/{pin}"
+                                 for instance, pin in zip(net.instances, net.pins)
+                                 if instance != buffer_name)
         
-        if load_pins:
-            load_pins_str = "{" + " ".join(load_pins) + "}"
-            buffered_net_name = buffer_output_net
-            
-            cmd = f"insert_buffer {load_pins_str} {buffer_type} {buffer_name} {buffered_net_name}"
-            return cmd
+        if load_pins_str:
+            return f"insert_buffer {{{load_pins_str}}} {buffer_type} {buffer_name} {buffer_output_net}"
         
         return None
     
@@ -221,170 +241,91 @@ class ECOAnalyzer:
         if not buffer_commands:
             return []
             
-        # Build dependency graph
-        buffer_info = {}  # {buffer_name: (command, dependencies)}
-        all_buffer_names = set()
-        
-        # First pass: collect all buffer names and their basic info
-        for cmd in buffer_commands:
-            parts = cmd.split()
-            if len(parts) >= 4:
-                buffer_name = parts[-2]  # new buffer cell name
-                all_buffer_names.add(buffer_name)
-                buffer_info[buffer_name] = (cmd, set())
-        
-        # Second pass: analyze dependencies
+        # Parse every command once: insert_buffer {loads} <type> <name> <net>
+        entries = []
         for cmd in buffer_commands:
             parts = cmd.split()
             if len(parts) >= 4:
-                buffer_name = parts[-2]  # new buffer cell name
-                dependencies = set()
-                
-                # Extract load pins from the command
-                load_pins_str = cmd.split('{')[1].split('}')[0]
-                load_pins = [pin.strip() for pin in load_pins_str.split()]
-                
-                # Check if any load pin belongs to another buffer
-                for load_pin in load_pins:
-                    if '/' in load_pin:
-                        instance = load_pin.split('/')[0]
-                        # If this instance is another buffer that needs to be created
-                        if instance in all_buffer_names and instance != buffer_name:
-                            dependencies.add(instance)
-                
-                # Additionally, check if this buffer's output net is used by other buffers
-                # If buffer A creates net X, and buffer B uses net X as input, then A must come before B
-                buffered_net = parts[-1]  # new buffered net name
-                
-                # Check if any other buffer uses this net as input
-                for other_cmd in buffer_commands:
-                    if other_cmd == cmd:
-                        continue
-                    other_parts = other_cmd.split()
-                    if len(other_parts) >= 4:
-                        other_buffer_name = other_parts[-2]
-                        # Check if this buffered net appears in other buffer's load pins
-                        if buffered_net in other_cmd and other_buffer_name != buffer_name:
-                            # This means other_buffer depends on current buffer
-                            # So we don't add dependency here, but we'll handle it in the reverse
-                            pass
-                
-                buffer_info[buffer_name] = (cmd, dependencies)
-        
-        # Third pass: Add reverse dependencies
-        # If buffer A's output is used by buffer B, then A must come before B
-        for cmd in buffer_commands:
-            parts = cmd.split()
-            if len(parts) >= 4:
-                buffer_name = parts[-2]
-                buffered_net = parts[-1]
-                
-                # Find other buffers that use this net
-                for other_cmd in buffer_commands:
-                    if other_cmd == cmd:
-                        continue
-                    other_parts = other_cmd.split()
-                    if len(other_parts) >= 4:
-                        other_buffer_name = other_parts[-2]
-                        
-                        # Check if the buffered net appears as input to other buffer
-                        other_load_pins_str = other_cmd.split('{')[1].split('}')[0]
-                        other_load_pins = [pin.strip() for pin in other_load_pins_str.split()]
-                        
-                        for load_pin in other_load_pins:
-                            # If the load pin references the buffered net or buffer
-                            if ('split' in load_pin and buffered_net.replace('net', 'split') in load_pin) or \
-                               (buffer_name in load_pin):
-                                # other_buffer depends on current buffer
-                                _, other_deps = buffer_info[other_buffer_name]
-                                other_deps.add(buffer_name)
-                                buffer_info[other_buffer_name] = (buffer_info[other_buffer_name][0], other_deps)
-        
-        # Topological sort to resolve dependencies
+                load_pins = cmd[cmd.index('{') + 1:cmd.index('}')].split()
+                # Load pins are "<instance>/<pin>"; hierarchical instance names may
+                # contain '/' themselves, so split on the last one only
+                load_insts = frozenset(pin.rpartition('/')[0] for pin in load_pins)
+                entries.append(BufEntry(cmd, parts[-2], load_insts))
+        
+        # Number buffers in name order, so the heap of ready IDs pops them by name
+        entries.sort(key=lambda entry: entry.name)
+        id_of = {entry.name: i for i, entry in enumerate(entries)}
+        
+        # Build dependency graph over buffer IDs
+        # A buffer depends on every other new buffer that appears among its loads,
+        # since that buffer's input pin must exist before it can be reconnected
+        dependents = [[] for _ in entries]  # dependents[i]: IDs of buffers depending on buffer i
+        indegree = [0] * len(entries)  # indegree[i]: number of unsatisfied dependencies of buffer i
+        for i, entry in enumerate(entries):
+            for instance in entry.load_insts:
+                dep = id_of.get(instance)
+                if dep is not None and dep != i:
+                    dependents[dep].append(i)
+                    indegree[i] += 1
+        
+        # Topological sort (Kahn); IDs are in ascending order, so this is already a heap
         sorted_commands = []
-        remaining = dict(buffer_info)
-        created_buffers = set()
-        
-        iteration = 0
-        while remaining:
-            iteration += 1
-            if iteration > 1000:  # Prevent infinite loop
-                print(f"Warning: Breaking infinite loop, remaining buffers: {len(remaining)}")
-                break
-                
-            # Find buffers with no unsatisfied dependencies
-            ready_buffers = []
-            for buf_name, (cmd, deps) in remaining.items():
-                if deps.issubset(created_buffers):
-                    ready_buffers.append(buf_name)
-            
-            if not ready_buffers:
-                # Circular dependency or error - add remaining in original order
-                print(f"Warning: Possible circular dependency in buffer commands, remaining: {len(remaining)}")
-                for buf_name, (cmd, deps) in remaining.items():
-                    print(f"  {buf_name}: deps={deps}")
-                    sorted_commands.append(cmd)
-                break
-            
-            # Sort ready buffers by name for consistent output
-            ready_buffers.sort()
-            
-            # Add ready buffers to sorted list
-            for buf_name in ready_buffers:
-                sorted_commands.append(remaining[buf_name][0])
-                created_buffers.add(buf_name)
-                del remaining[buf_name]
+        placed = [False] * len(entries)
+        ready = [i for i, count in enumerate(indegree) if count == 0]
+        
+        while ready:
+            i = heapq.heappop(ready)
+            sorted_commands.append(entries[i].cmd)
+            placed[i] = True
+            for dependent in dependents[i]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    heapq.heappush(ready, dependent)
+        
+        if len(sorted_commands) < len(entries):
+            # Circular dependency - add remaining in name order
+            print(f"Warning: Possible circular dependency in buffer commands, remaining: {len(entries) - len(sorted_commands)}")
+            for i, entry in enumerate(entries):
+                if not placed[i]:
+                    deps = set(entry.load_insts & id_of.keys()) - {entry.name}
+                    print(f"  {entry.name}: deps={deps}")
+                    sorted_commands.append(entry.cmd)
         
         print(f"Sorted {len(sorted_commands)} buffer commands")
         return sorted_commands
     
-    def print_results(self):
-        """Print the ECO changelist"""
-        print("\n" + "="*80)
-        print("ECO CHANGELIST")
-        print("="*80)
+    def _iter_report(self):
+        """Yield the lines of the ECO changelist report"""
+        yield "ECO CHANGELIST\n"
+        yield "="*80 + "\n\n"
         
-        print(f"\nSizing Commands ({len(self.sizing_commands)}):")
-        print("-" * 40)
+        yield f"Sizing Commands ({len(self.sizing_commands)}):\n"
+        yield "-" * 40 + "\n"
         if self.sizing_commands:
             for i, cmd in enumerate(self.sizing_commands, 1):
-                print(f"{i:2d}. {cmd}")
+                yield f"{i:2d}. {cmd}\n"
         else:
-            print("   No sizing changes found.")
+            yield "   No sizing changes found.\n"
         
-        print(f"\nBuffering Commands ({len(self.buffering_commands)}):")
-        print("-" * 40)
+        yield f"\nBuffering Commands ({len(self.buffering_commands)}):\n"
+        yield "-" * 40 + "\n"
         if self.buffering_commands:
             for i, cmd in enumerate(self.buffering_commands, 1):
-                print(f"{i:2d}. {cmd}")
+                yield f"{i:2d}. {cmd}\n"
         else:
-            print("   No buffer insertions found.")
+            yield "   No buffer insertions found.\n"
         
-        print(f"\nTotal ECO Changes: {len(self.sizing_commands) + len(self.buffering_commands)}")
+        yield f"\nTotal ECO Changes: {len(self.sizing_commands) + len(self.buffering_commands)}\n"
+    
+    def print_results(self):
+        """Print the ECO changelist"""
+        sys.stdout.write("\n")
+        sys.stdout.writelines(self._iter_report())
     
     def save_results(self, output_file: str):
         """Save results to file"""
-        with open(output_file, 'w') as f:
-            f.write("ECO CHANGELIST\n")
-            f.write("="*80 + "\n\n")
-            
-            f.write(f"Sizing Commands ({len(self.sizing_commands)}):\n")
-            f.write("-" * 40 + "\n")
-            if self.sizing_commands:
-                for i, cmd in enumerate(self.sizing_commands, 1):
-                    f.write(f"{i:2d}. {cmd}\n")
-            else:
-                f.write("   No sizing changes found.\n")
-            
-            f.write(f"\nBuffering Commands ({len(self.buffering_commands)}):\n")
-            f.write("-" * 40 + "\n")
-            if self.buffering_commands:
-                for i, cmd in enumerate(self.buffering_commands, 1):
-                    f.write(f"{i:2d}. {cmd}\n")
-            else:
-                f.write("   No buffer insertions found.\n")
-            
-            f.write(f"\nTotal ECO Changes: {len(self.sizing_commands) + len(self.buffering_commands)}\n")
+        with open(output_file, 'w', buffering=1 << 16) as f:
+            f.writelines(self._iter_report())
 
 def main():
     if len(sys.argv) < 3: